@@ -0,0 +1,251 @@
+"""
+CDC 과거 데이터 일괄 적재(Backfill) CLI
+
+신규 부문 온보딩 시 수백 개의 과거 일자별 파일을 /api/upload 로 하나씩 올리고
+분석 버튼을 누르는 대신, 디렉토리를 통째로 읽어서 한 번에 적재합니다.
+
+- 파일명에서 날짜 추출 (예: CDC_2026-01-02.xlsx, 20260102.csv)
+- 프로세스 풀로 병렬 파싱 (preprocess_file 동일 로직)
+- 연속된 날짜 쌍 분석 결과를 ReportCache 에 저장 (월별 통계/요약에 바로 반영)
+- 배치 단위 트랜잭션 커밋 -> 중단 후 다시 실행하면 이미 처리된 날짜/분석은 건너뜀
+
+사용법:
+    python backfill.py /path/to/exports --workers 8 --batch-size 20
+    python backfill.py /path/to/exports --db sqlite:///./cdc_dashboard.db --force
+
+주의: 실행 중인 API 서버의 스냅샷 메모리 캐시는 갱신되지 않으므로,
+기존 날짜를 덮어쓴 경우(--force 등) 서버를 재시작하세요.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from services.file_handler import infer_date_from_filename, SUPPORTED_EXTENSIONS
+from services.cdc_logic import run_cdc_analysis
+from services.snapshot_cache import load_snapshot
+from services.span_composer import CHANGE_SET_MARKER
+
+
+def scan_directory(directory: str, recursive: bool = False):
+    """디렉토리에서 지원 파일을 찾아 {날짜: 경로} 로 반환합니다."""
+    found = {}
+    skipped = []
+
+    if recursive:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+
+    for path in sorted(paths):
+        name = os.path.basename(path)
+        if not os.path.isfile(path) or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        date = infer_date_from_filename(name)
+        if not date:
+            skipped.append((name, "파일명에서 날짜를 찾을 수 없음"))
+            continue
+        if date in found:
+            skipped.append((name, f"날짜 중복 ({date}, {os.path.basename(found[date])} 사용)"))
+            continue
+        found[date] = path
+
+    return found, skipped
+
+
+def _parse_worker(task):
+    """
+    프로세스 풀 작업 함수. source 는 파일 경로(str) 또는 DB 에 저장된 원본(bytes).
+    반환: (날짜, Snapshot 또는 None, 바이트 수, 소요 시간)
+    """
+    date, source, verbose = task
+    started = time.perf_counter()
+
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            content = f.read()
+    else:
+        content = source
+
+    snap = load_snapshot(content, verbose=verbose)
+    return date, snap, len(content), time.perf_counter() - started
+
+
+def run_backfill(directory: str, workers: int, batch_size: int, force: bool = False,
+                 recursive: bool = False, verbose: bool = False):
+    # DB 모듈은 --db 옵션(CDC_DATABASE_URL) 반영 후에 임포트
+    from sqlalchemy import func
+    from database import SessionLocal, DailyData, ReportCache
+
+    started = time.perf_counter()
+    files, skipped_files = scan_directory(directory, recursive)
+    for name, reason in skipped_files:
+        print(f"⚠️ 건너뜀: {name} ({reason})")
+    print(f"📂 [Backfill] 대상 파일 {len(files)}개 발견")
+
+    db = SessionLocal()
+    try:
+        # 1. 기존 적재 상태 확인 (파일명 + 크기가 같으면 이미 적재된 것으로 간주)
+        existing = {
+            date: (filename, size)
+            for date, filename, size in db.query(DailyData.date, DailyData.filename, func.length(DailyData.content)).all()
+        }
+        changed_dates = set()
+        for date, path in files.items():
+            if force or existing.get(date) != (os.path.basename(path), os.path.getsize(path)):
+                changed_dates.add(date)
+
+        # 2. 분석이 필요한 연속 날짜 쌍 계산 (/api/stats/monthly 와 같은 '직전 날짜' 기준)
+        #    change_set 이 없는 이전 분석 결과는 기간 합성에 쓸 수 없으므로 없는 것으로 보고 다시 분석
+        all_dates = sorted(set(existing) | set(files))
+        cached_keys = {k for (k,) in db.query(ReportCache.id).all()}
+        composable_keys = {
+            k for (k,) in db.query(ReportCache.id)
+            .filter(ReportCache.result_json.contains(CHANGE_SET_MARKER, autoescape=True)).all()
+        }
+        pairs = {}
+        stale_pairs = 0
+        for prev_date, curr_date in zip(all_dates, all_dates[1:]):
+            key = f"{prev_date}_{curr_date}"
+            if prev_date in changed_dates or curr_date in changed_dates or key not in composable_keys:
+                pairs[curr_date] = prev_date
+                if key in cached_keys and prev_date not in changed_dates and curr_date not in changed_dates:
+                    stale_pairs += 1
+        if stale_pairs:
+            print(f"ℹ️ change_set 없는 이전 분석 결과 {stale_pairs}쌍 -> 다시 분석")
+
+        parse_dates = sorted(set(pairs) | set(pairs.values()))
+        print(f"🔎 신규/변경 파일 {len(changed_dates)}개, 분석 필요 {len(pairs)}쌍, 파싱 대상 {len(parse_dates)}개")
+
+        def tasks():
+            for date in parse_dates:
+                if date in files:
+                    yield date, files[date], verbose
+                else:
+                    record = db.query(DailyData.content).filter(DailyData.date == date).first()
+                    yield date, record[0], verbose
+
+        def write_daily(date):
+            path = files[date]
+            with open(path, "rb") as f:
+                content = f.read()
+            db.merge(DailyData(date=date, filename=os.path.basename(path), content=content))
+            # 내용이 바뀐 날짜가 포함된 기존 분석 결과는 무효화 (/api/upload 와 동일)
+            db.query(ReportCache).filter(
+                (ReportCache.date_old == date) | (ReportCache.date_new == date)
+            ).delete(synchronize_session=False)
+
+        stats = {"parsed": 0, "parse_failed": 0, "bytes": 0, "parse_seconds": 0.0,
+                 "stored": 0, "analyzed": 0, "analyze_seconds": 0.0}
+        pending_in_batch = 0
+        last_date, last_snap = None, None
+
+        # 3. 병렬 파싱 결과를 날짜 순서대로 받아서 분석/저장 (메모리에는 직전 스냅샷만 유지)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            queue = deque()
+            task_iter = tasks()
+
+            def fill():
+                while len(queue) < workers * 2:
+                    task = next(task_iter, None)
+                    if task is None:
+                        return
+                    queue.append(pool.submit(_parse_worker, task))
+
+            fill()
+            while queue:
+                date, snap, nbytes, seconds = queue.popleft().result()
+                fill()
+
+                stats["bytes"] += nbytes
+                stats["parse_seconds"] += seconds
+                if snap is None:
+                    stats["parse_failed"] += 1
+                    print(f"❌ {date}: 데이터 전처리 실패")
+                else:
+                    stats["parsed"] += 1
+
+                if date in changed_dates:
+                    write_daily(date)
+                    changed_dates.discard(date)
+                    stats["stored"] += 1
+                    pending_in_batch += 1
+
+                prev_date = pairs.get(date)
+                if prev_date and prev_date == last_date and snap is not None and last_snap is not None:
+                    t = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()) if not verbose else contextlib.nullcontext():
+                        result = run_cdc_analysis(
+                            last_snap.frame, snap.frame, date,
+                            values_old=last_snap.values_frame(), values_new=snap.values_frame()
+                        )
+                    db.merge(ReportCache(
+                        id=f"{prev_date}_{date}", date_old=prev_date, date_new=date,
+                        result_json=json.dumps(result, ensure_ascii=False)
+                    ))
+                    stats["analyze_seconds"] += time.perf_counter() - t
+                    stats["analyzed"] += 1
+                    pending_in_batch += 1
+
+                last_date, last_snap = date, snap
+
+                if pending_in_batch >= batch_size:
+                    db.commit()
+                    pending_in_batch = 0
+                    print(f"💾 커밋 완료: ~{date} (파싱 {stats['parsed']}, 분석 {stats['analyzed']})")
+
+        # 분석 쌍에 포함되지 않은 변경 파일 (예: 날짜가 하나뿐인 경우)
+        for date in sorted(changed_dates):
+            write_daily(date)
+            stats["stored"] += 1
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print_report(stats, elapsed, workers)
+    return stats
+
+
+def print_report(stats: dict, elapsed: float, workers: int):
+    mb = stats["bytes"] / (1024 * 1024)
+    print("\n========== Backfill 결과 ==========")
+    print(f"전체 소요 시간     : {elapsed:.1f}s (workers={workers})")
+    print(f"파싱               : {stats['parsed']}개 성공 / {stats['parse_failed']}개 실패, {mb:.1f}MB")
+    print(f"파싱 처리량        : {stats['parsed'] / elapsed if elapsed else 0:.2f} files/s, {mb / elapsed if elapsed else 0:.2f} MB/s")
+    print(f"파싱 CPU 시간 합계 : {stats['parse_seconds']:.1f}s")
+    print(f"DailyData 저장     : {stats['stored']}개")
+    print(f"분석(ReportCache)  : {stats['analyzed']}쌍, {stats['analyze_seconds']:.1f}s")
+    print("===================================")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CDC 과거 일자별 파일 일괄 적재 및 연속 날짜 분석")
+    parser.add_argument("directory", help="일자별 export 파일(.xlsx/.xls/.csv)이 있는 디렉토리")
+    parser.add_argument("--db", help="DB URL (기본값: CDC_DATABASE_URL 환경 변수 또는 서버 기본 경로)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="파싱 프로세스 수")
+    parser.add_argument("--batch-size", type=int, default=20, help="커밋 단위 (저장 + 분석 건수)")
+    parser.add_argument("--force", action="store_true", help="이미 적재된 날짜도 다시 저장/분석")
+    parser.add_argument("--recursive", action="store_true", help="하위 디렉토리까지 검색")
+    parser.add_argument("--verbose", action="store_true", help="파일 전처리 로그 출력")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"디렉토리가 없습니다: {args.directory}")
+    if args.db:
+        os.environ["CDC_DATABASE_URL"] = args.db
+
+    run_backfill(args.directory, max(1, args.workers), max(1, args.batch_size),
+                 force=args.force, recursive=args.recursive, verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import os
+from sqlalchemy import create_engine, Column, String, Integer, LargeBinary, Text
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+# ==========================================
+# [DB 설정] SQLite
+# ==========================================
+# API 서버(main.py)와 배치 CLI(backfill.py)가 같은 모델을 씁니다.
+# CDC_DATABASE_URL 로 DB 위치를 바꿀 수 있습니다.
+# SQLALCHEMY_DATABASE_URL = "sqlite:///./cdc_dashboard.db" # local 용
+SQLALCHEMY_DATABASE_URL = os.getenv("CDC_DATABASE_URL", "sqlite:////app/data/cdc_database.db")
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+class DailyData(Base):
+    __tablename__ = "daily_data"
+    date = Column(String, primary_key=True, index=True) 
+    filename = Column(String)
+    content = Column(LargeBinary) 
+
+class ReportCache(Base):
+    __tablename__ = "report_cache"
+    id = Column(String, primary_key=True, index=True) 
+    date_old = Column(String)
+    date_new = Column(String)
+    result_json = Column(Text) 
+
+Base.metadata.create_all(bind=engine)
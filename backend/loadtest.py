@@ -0,0 +1,433 @@
+"""
+CDC 백엔드 부하 테스트 하네스
+
+오전 9시에 기획 담당자 수십 명이 동시에 대시보드를 여는 상황을 재현합니다.
+- 임시 디렉토리에 합성 일자별 export 파일 생성 후 backfill 로 임시 SQLite DB 적재
+- vLLM 대신 로컬 스텁 LLM 서버(OpenAI 호환 /v1/chat/completions) 실행
+- uvicorn 으로 앱을 별도 프로세스로 띄우고, 가상 사용자 스레드가 트래픽 비율대로 요청
+- 엔드포인트별 p50/p95/p99 지연, 처리량, 오류율 리포트 (+ SLO 판정)
+
+사용법:
+    python loadtest.py --users 50 --duration 60
+    python loadtest.py --users 20 --duration 30 --mix dates=40,monthly=30,analyze=20,ask=10 \\
+        --days 20 --projects 3000 --slo analyze:p95=3000 --slo dates:p99=200 --json result.json
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "dates=40,monthly=30,analyze=20,ask=10"
+ENDPOINTS = ("dates", "monthly", "analyze", "ask")
+
+# get_ai_insight 는 LLM 호출 실패 시에도 HTTP 200 으로 이 문구를 돌려주므로 본문으로 판별
+AI_ERROR_PREFIX = "AI 분석 오류"
+
+
+# =========================================================
+# 1. 합성 데이터 생성
+# =========================================================
+def generate_exports(directory: str, days: int, projects: int, start: date, seed: int = 0):
+    """
+    preprocess_file 이 읽는 형식(제목 행 + 헤더 + 7행 여백 + 데이터)의 일자별 CSV 를 만듭니다.
+    날마다 일부 프로젝트가 추가/삭제되고 일부 월 금액이 바뀝니다.
+    """
+    rnd = random.Random(seed)
+    months = [f"{m}월" for m in range(1, 13)]
+    header = ["PJT", "PJT명", "주관부서", "부문", "수주가능성", "매출(계)"] + months
+
+    state = {}
+    next_id = 0
+    for _ in range(projects):
+        state[f"PJT{next_id:06d}"] = _random_project(rnd, next_id)
+        next_id += 1
+
+    dates = []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        if d > 0:
+            # 하루치 변동: 약 1% 삭제, 1% 신규, 5% 금액 변경
+            for pid in rnd.sample(list(state), k=max(1, len(state) // 100)):
+                del state[pid]
+            for _ in range(max(1, projects // 100)):
+                state[f"PJT{next_id:06d}"] = _random_project(rnd, next_id)
+                next_id += 1
+            for pid in rnd.sample(list(state), k=max(1, len(state) // 20)):
+                values = state[pid]["values"]
+                values[rnd.randrange(12)] += rnd.randint(-5, 5) * 1_000_000
+
+        buf = io.StringIO()
+        buf.write("CDC 일일 리포트" + "," * (len(header) - 1) + "\n")
+        buf.write(",".join(header) + "\n")
+        for _ in range(7):
+            buf.write("," * (len(header) - 1) + "\n")
+        for pid, p in state.items():
+            row = [pid, p["name"], p["dept"], p["sector"], str(p["prob"]), str(sum(p["values"]))]
+            buf.write(",".join(row + [str(v) for v in p["values"]]) + "\n")
+
+        path = os.path.join(directory, f"CDC_{day.strftime('%Y%m%d')}.csv")
+        with open(path, "w", encoding="utf-8-sig") as f:
+            f.write(buf.getvalue())
+        dates.append(day.strftime("%Y-%m-%d"))
+    return dates
+
+def _random_project(rnd: random.Random, idx: int):
+    return {
+        "name": f"{rnd.choice(['차세대', '고도화', '유지보수', '구축', '전환'])} 사업 {idx}",
+        "dept": f"사업{rnd.randint(1, 30)}팀",
+        "sector": f"{rnd.randint(1, 5)}부문",
+        "prob": rnd.choice([10, 30, 50, 70, 90, 100]),
+        "values": [rnd.randint(0, 20) * 1_000_000 for _ in range(12)],
+    }
+
+
+# =========================================================
+# 2. 스텁 LLM 서버 (OpenAI 호환)
+# =========================================================
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    error_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.delay)
+        if random.random() < self.error_rate:
+            self.send_error(500, "stub failure")
+            return
+        payload = json.dumps({
+            "id": "stub-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "스텁 응답: 주요 변동은 신규 추가와 이월입니다."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_llm(port: int, delay: float, error_rate: float = 0.0):
+    handler = type("StubLLMHandler", (_StubLLMHandler,), {"delay": delay, "error_rate": error_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# =========================================================
+# 3. 앱 서버 실행
+# =========================================================
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_app(port: int, env: dict, log_path: str, workers: int):
+    log = open(log_path, "w")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"앱 서버 실행 실패 (로그: {log_path})")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/dates")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError(f"앱 서버 응답 없음 (로그: {log_path})")
+
+
+# =========================================================
+# 4. 트래픽 재생
+# =========================================================
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"알 수 없는 엔드포인트: {name} (가능: {', '.join(ENDPOINTS)})")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f"비율은 숫자여야 합니다: {part}")
+        if mix[name] < 0:
+            raise ValueError(f"비율은 0 이상이어야 합니다: {part}")
+    if not any(mix.values()):
+        raise ValueError("비율 합계가 0 입니다")
+    return mix
+
+class Recorder:
+    def __init__(self):
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.error_examples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, latency_ms: float, error: str = None):
+        with self._lock:
+            self.samples[name].append(latency_ms)
+            if error:
+                self.errors[name] += 1
+                self.error_examples.setdefault(name, error)
+
+def build_request(name: str, dates: list, rnd: random.Random, context: dict):
+    """엔드포인트 이름 -> (method, path, body)"""
+    if name == "dates":
+        return "GET", "/api/dates", None
+    if name == "monthly":
+        year, month, _ = rnd.choice(dates).split("-")
+        return "GET", f"/api/stats/monthly?year={year}&month={month}", None
+    if name == "analyze":
+        # 대부분은 전일 대비, 일부는 월초 기준 기간 비교
+        i = rnd.randrange(1, len(dates))
+        j = i - 1 if rnd.random() < 0.7 else 0
+        return "POST", "/api/analyze", {"date_old": dates[j], "date_new": dates[i]}
+    return "POST", "/api/ask-report", {"question": "오늘 가장 큰 변동은?", "context_data": context}
+
+def response_error(name: str, status: int, body: bytes):
+    """응답을 오류로 볼지 판별. 오류면 설명 문자열, 아니면 None"""
+    if status >= 400:
+        return f"HTTP {status}"
+    if name == "ask":
+        try:
+            answer = json.loads(body).get("answer")
+        except (ValueError, AttributeError):
+            return "응답 JSON 파싱 실패"
+        if not isinstance(answer, str) or answer.startswith(AI_ERROR_PREFIX):
+            return "LLM 오류: " + " ".join(str(answer).split())[:120]
+    return None
+
+def virtual_user(port: int, mix: dict, dates: list, context: dict, recorder: Recorder,
+                 stop_at: float, record_after: float, seed: int, think_time: float):
+    rnd = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+
+    while time.time() < stop_at:
+        name = rnd.choices(names, weights)[0]
+        method, path, body = build_request(name, dates, rnd, context)
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+
+        started = time.perf_counter()
+        error = None
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            error = response_error(name, resp.status, resp.read())
+        except (OSError, http.client.HTTPException) as e:
+            error = f"{type(e).__name__}: {e}"
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        if time.time() >= record_after:
+            recorder.add(name, latency_ms, error)
+        if think_time:
+            time.sleep(rnd.uniform(0, think_time))
+    conn.close()
+
+
+# =========================================================
+# 5. 리포트
+# =========================================================
+def percentile(sorted_values: list, pct: float):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def parse_slo(specs: list):
+    """['analyze:p95=3000', ...] -> {'analyze': {'p95': 3000.0}}"""
+    slo = {}
+    for spec in specs or []:
+        name, _, rule = spec.partition(":")
+        metric, _, limit = rule.partition("=")
+        try:
+            if name not in ENDPOINTS or metric not in ("p50", "p95", "p99"):
+                raise ValueError
+            slo.setdefault(name, {})[metric] = float(limit)
+        except ValueError:
+            raise ValueError(f"SLO 형식 오류: {spec} (예: analyze:p95=3000)")
+    return slo
+
+def summarize(recorder: Recorder, measured_seconds: float, slo: dict):
+    report = {}
+    for name in ENDPOINTS:
+        values = sorted(recorder.samples[name])
+        if not values:
+            continue
+        row = {
+            "requests": len(values),
+            "errors": recorder.errors[name],
+            "error_rate": recorder.errors[name] / len(values),
+            "throughput_rps": len(values) / measured_seconds if measured_seconds else 0.0,
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": values[-1],
+        }
+        if name in slo:
+            row["slo"] = {metric: {"limit_ms": limit, "pass": row[f"{metric}_ms"] <= limit}
+                          for metric, limit in slo[name].items()}
+        if name in recorder.error_examples:
+            row["error_example"] = recorder.error_examples[name]
+        report[name] = row
+    return report
+
+def print_report(report: dict, measured_seconds: float, users: int):
+    total = sum(r["requests"] for r in report.values())
+    errors = sum(r["errors"] for r in report.values())
+    print("\n================ 부하 테스트 결과 ================")
+    print(f"측정 구간 {measured_seconds:.1f}s, 가상 사용자 {users}명, 전체 {total}건 "
+          f"({total / measured_seconds if measured_seconds else 0:.1f} req/s), 오류 {errors}건")
+    print(f"{'endpoint':<10}{'req':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  SLO")
+    for name, r in report.items():
+        slo_text = ", ".join(
+            f"{m}≤{v['limit_ms']:.0f} {'PASS' if v['pass'] else 'FAIL'}" for m, v in r.get("slo", {}).items()
+        )
+        print(f"{name:<10}{r['requests']:>7}{r['throughput_rps']:>8.1f}{r['error_rate'] * 100:>6.1f}%"
+              f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['max_ms']:>9.0f}  {slo_text}")
+        if "error_example" in r:
+            print(f"{'':<10}  예: {r['error_example']}")
+    print("(지연 단위: ms)")
+    print("=================================================")
+
+
+# =========================================================
+# 실행
+# =========================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CDC 백엔드 부하 테스트 (임시 DB + 스텁 LLM)")
+    parser.add_argument("--users", type=int, default=50, help="동시 가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=60, help="측정 시간(초)")
+    parser.add_argument("--warmup", type=float, default=5, help="집계에서 제외할 초기 구간(초)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"트래픽 비율 (기본값: {DEFAULT_MIX})")
+    parser.add_argument("--think-time", type=float, default=0.0, help="요청 사이 최대 대기 시간(초, 0~값 균등 분포)")
+    parser.add_argument("--days", type=int, default=10, help="합성 일자 수")
+    parser.add_argument("--projects", type=int, default=2000, help="일자별 프로젝트 수")
+    parser.add_argument("--start-date", default="2026-01-01", help="합성 데이터 시작일")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="스텁 LLM 응답 지연(초)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="스텁 LLM 이 500 을 돌려줄 비율 (0~1)")
+    parser.add_argument("--app-workers", type=int, default=1, help="uvicorn worker 수")
+    parser.add_argument("--slo", action="append", help="SLO 기준 (예: analyze:p95=3000, 여러 번 지정 가능)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    parser.add_argument("--keep", action="store_true", help="임시 디렉토리(DB/로그) 유지")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        slo = parse_slo(args.slo)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.days < 2:
+        parser.error("--days 는 2 이상이어야 합니다")
+
+    workdir = tempfile.mkdtemp(prefix="cdc_loadtest_")
+    export_dir = os.path.join(workdir, "exports")
+    os.makedirs(export_dir)
+    db_url = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    stub = None
+    app = None
+
+    try:
+        # 1. 데이터 생성 및 적재 (backfill 로 DailyData + 연속 날짜 ReportCache 생성)
+        print(f"🧪 작업 디렉토리: {workdir}")
+        start = date.fromisoformat(args.start_date)
+        dates = generate_exports(export_dir, args.days, args.projects, start, seed=args.seed)
+        os.environ["CDC_DATABASE_URL"] = db_url
+        sys.path.insert(0, BACKEND_DIR)
+        from backfill import run_backfill
+        run_backfill(export_dir, workers=min(os.cpu_count() or 1, 4), batch_size=20)
+
+        # ask-report 컨텍스트: 실제 화면처럼 분석 결과 요약을 넘김
+        from database import SessionLocal, ReportCache
+        with SessionLocal() as db:
+            cached = db.query(ReportCache).first()
+            stats = json.loads(cached.result_json)["summary_stats"] if cached else {}
+        context = {k: v for k, v in stats.items() if k.endswith(("_count", "_amount", "_top"))}
+
+        # 2. 스텁 LLM + 앱 서버 실행
+        stub_port, app_port = _free_port(), _free_port()
+        stub = start_stub_llm(stub_port, args.llm_delay, args.llm_error_rate)
+        env = dict(os.environ, CDC_DATABASE_URL=db_url,
+                   VLLM_API_BASE=f"http://127.0.0.1:{stub_port}/v1", VLLM_MODEL_NAME="stub", OPENAI_API_KEY="EMPTY")
+        app = start_app(app_port, env, os.path.join(workdir, "app.log"), args.app_workers)
+        print(f"🚀 앱 서버 :{app_port}, 스텁 LLM :{stub_port}, 가상 사용자 {args.users}명, {args.duration:.0f}s")
+
+        # 3. 트래픽 재생
+        recorder = Recorder()
+        begin = time.time()
+        record_after = begin + args.warmup
+        stop_at = record_after + args.duration
+        threads = [
+            threading.Thread(target=virtual_user, daemon=True, args=(
+                app_port, mix, dates, context, recorder, stop_at, record_after, args.seed + i, args.think_time))
+            for i in range(args.users)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        measured = time.time() - record_after
+
+        # 4. 리포트
+        report = summarize(recorder, measured, slo)
+        print_report(report, measured, args.users)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"config": vars(args), "measured_seconds": measured, "endpoints": report},
+                          f, ensure_ascii=False, indent=2)
+            print(f"💾 결과 저장: {args.json}")
+
+        failed = any(not v["pass"] for r in report.values() for v in r.get("slo", {}).values())
+        return 1 if failed else 0
+    finally:
+        if app is not None:
+            app.terminate()
+            try:
+                app.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                app.kill()
+        if stub is not None:
+            stub.shutdown()
+        if args.keep:
+            print(f"📁 임시 디렉토리 유지: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
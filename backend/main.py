@@ -1,43 +1,30 @@
 import traceback
 import io
+import os
 import json
+import asyncio
+import zipfile
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
-from typing import Dict, Any, Optional
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional, List
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, String, Integer, LargeBinary, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+
+# DB 모델/세션 (database.py)
+from database import SessionLocal, DailyData, ReportCache
 
 # 서비스 로직 임포트
 from services.ai_service import get_ai_insight
-from services.file_handler import preprocess_file
+from services.file_handler import preprocess_file, infer_date_from_filename, extract_archive_files
 from services.cdc_logic import run_cdc_analysis
-
-# ==========================================
-# [DB 설정] SQLite
-# ==========================================
-# SQLALCHEMY_DATABASE_URL = "sqlite:///./cdc_dashboard.db" # local 용
-SQLALCHEMY_DATABASE_URL = "sqlite:////app/data/cdc_database.db"
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-class DailyData(Base):
-    __tablename__ = "daily_data"
-    date = Column(String, primary_key=True, index=True) 
-    filename = Column(String)
-    content = Column(LargeBinary) 
-
-class ReportCache(Base):
-    __tablename__ = "report_cache"
-    id = Column(String, primary_key=True, index=True) 
-    date_old = Column(String)
-    date_new = Column(String)
-    result_json = Column(Text) 
-
-Base.metadata.create_all(bind=engine)
+from services.job_manager import JobManager
+from services.snapshot_cache import SnapshotCache, load_snapshot
+from services.span_composer import compose_change_sets, is_composable
+from services.report_exporter import SHEETS, iter_csv, iter_ndjson, iter_xlsx
 
 # ==========================================
 # [FastAPI 설정]
@@ -58,9 +45,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 파싱된 스냅샷 메모리 캐시 (CDC_SNAPSHOT_CACHE_MB 로 용량 조절)
+snapshot_cache = SnapshotCache()
+
 class AnalyzeRequest(BaseModel):
     date_old: str
     date_new: str
+    match_recoded: bool = False  # 코드 재발급 프로젝트 매칭 (신규+취소 쌍 -> 코드 변경)
 
 # ---------------------------------------------------------
 # API: 파일 업로드
@@ -87,6 +78,7 @@ async def upload_daily_file(
         ).delete()
         
         db.commit()
+        snapshot_cache.invalidate(date)
         return {"message": "저장 완료"}
     except Exception as e:
         db.rollback()
@@ -94,6 +86,153 @@ async def upload_daily_file(
     finally:
         db.close()
 
+# ---------------------------------------------------------
+# API: 일괄 업로드 (여러 파일 또는 zip)
+# ---------------------------------------------------------
+# 파싱은 프로세스 풀에서 병렬로, 저장은 한 트랜잭션으로 처리합니다.
+# 서버 프로세스에는 이미 스레드(요청 스레드풀, JobManager)가 돌고 있어서 fork 로 띄우면
+# 다른 스레드가 잡고 있던 lock 이 자식에 그대로 복사되어 멈출 수 있으므로 spawn 으로 띄웁니다.
+_parse_pool = None
+
+def get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=int(os.getenv("CDC_PARSE_WORKERS", os.cpu_count() or 1)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _parse_pool
+
+def reset_parse_pool(broken=None, wait: bool = False):
+    """
+    작업 프로세스가 비정상 종료(OOM 등)되면 풀 전체가 broken 상태가 되므로 버리고 다음 요청에서 새로 만듦.
+    broken: 실패한 풀. 그 사이 다른 요청이 이미 새 풀로 바꿨으면 새 풀은 건드리지 않음
+    """
+    global _parse_pool
+    pool = _parse_pool
+    if pool is None or (broken is not None and pool is not broken):
+        return
+    _parse_pool = None
+    pool.shutdown(wait=wait, cancel_futures=True)
+
+@app.on_event("shutdown")
+def shutdown_parse_pool():
+    reset_parse_pool(wait=True)
+
+@app.post("/api/upload/bulk")
+async def upload_bulk_files(
+    files: List[UploadFile] = File(default=[]),
+    archive: Optional[UploadFile] = File(None),
+    dates: Optional[str] = Form(None),
+):
+    """
+    여러 파일(또는 zip 압축 파일)을 한 번에 업로드합니다.
+    dates: {"파일명": "YYYY-MM-DD"} 형태의 JSON 문자열 (생략한 파일은 파일명에서 날짜 추출)
+    반환: 파일별 처리 결과 (saved / error)
+    """
+    try:
+        date_map = json.loads(dates) if dates else {}
+        if not isinstance(date_map, dict):
+            raise ValueError
+    except ValueError:
+        raise HTTPException(status_code=400, detail="dates 는 {파일명: 날짜} JSON 이어야 합니다")
+
+    entries = [(f.filename, await f.read()) for f in files]
+    if archive is not None:
+        try:
+            entries.extend(extract_archive_files(await archive.read()))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="zip 파일을 열 수 없습니다")
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="업로드할 파일 없음")
+
+    # 1. 날짜 매핑 검증
+    results = []
+    valid = []  # (결과 dict, content)
+    seen_dates = {}
+    for filename, content in entries:
+        date = date_map.get(filename) or infer_date_from_filename(filename)
+        status = {"filename": filename, "date": date, "status": "error", "detail": None}
+        results.append(status)
+
+        if not date:
+            status["detail"] = "날짜 없음 (dates 매핑 또는 파일명에 날짜 필요)"
+            continue
+        if not isinstance(date, str):
+            status["detail"] = f"날짜 형식 오류: {date!r} (YYYY-MM-DD 문자열)"
+            continue
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            status["detail"] = f"날짜 형식 오류: {date}"
+            continue
+        if date in seen_dates:
+            status["detail"] = f"날짜 중복 ({seen_dates[date]})"
+            continue
+        seen_dates[date] = filename
+        valid.append((status, content))
+
+    # 2. 병렬 파싱 (검증 겸 스냅샷 캐시 예열)
+    loop = asyncio.get_running_loop()
+    snaps = []
+    for attempt in range(2):
+        pool = get_parse_pool()
+        snaps = await asyncio.gather(
+            *[loop.run_in_executor(pool, load_snapshot, content, False) for _, content in valid],
+            return_exceptions=True
+        )
+        if not any(isinstance(snap, BrokenProcessPool) for snap in snaps):
+            break
+        # 작업 프로세스가 죽으면 풀을 새로 만들고 이번 묶음을 한 번만 다시 시도
+        print(f"⚠️ [Bulk Upload] 파싱 프로세스 비정상 종료 -> 풀 재생성 (시도 {attempt + 1}/2)")
+        reset_parse_pool(pool)
+    else:
+        raise HTTPException(status_code=503, detail="파싱 프로세스가 비정상 종료되었습니다. 파일 크기를 확인 후 다시 시도하세요")
+
+    parsed = []  # (결과 dict, content, snapshot)
+    for (status, content), snap in zip(valid, snaps):
+        if isinstance(snap, Exception):
+            status["detail"] = f"파싱 오류: {snap}"
+        elif snap is None:
+            status["detail"] = "데이터 전처리 실패"
+        else:
+            status["rows"] = len(snap.frame)
+            parsed.append((status, content, snap))
+
+    # 3. 한 트랜잭션으로 저장 + 관련 분석 캐시 한 번에 무효화
+    affected = [status["date"] for status, _, _ in parsed]
+    if affected:
+        db = SessionLocal()
+        try:
+            for status, content, _ in parsed:
+                db.merge(DailyData(date=status["date"], filename=status["filename"], content=content))
+
+            db.query(ReportCache).filter(
+                ReportCache.date_old.in_(affected) | ReportCache.date_new.in_(affected)
+            ).delete(synchronize_session=False)
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+        finally:
+            db.close()
+
+        for status, _, snap in parsed:
+            snapshot_cache.invalidate(status["date"])
+            snapshot_cache.put(status["date"], snap)
+            status["status"] = "saved"
+
+    saved = len(affected)
+    return {
+        "message": f"저장 완료 {saved}건 / 실패 {len(results) - saved}건",
+        "date_range": [min(affected), max(affected)] if affected else None,
+        "files": results,
+    }
+
 # ---------------------------------------------------------
 # API: 날짜 목록 조회
 # ---------------------------------------------------------
@@ -119,6 +258,7 @@ def delete_daily_data(date: str):
         db.query(ReportCache).filter((ReportCache.date_old == date) | (ReportCache.date_new == date)).delete()
         
         db.commit()
+        snapshot_cache.invalidate(date)
         return {"message": "삭제 완료"}
     except Exception as e:
         db.rollback()
@@ -126,6 +266,105 @@ def delete_daily_data(date: str):
     finally:
         db.close()
 
+# ---------------------------------------------------------
+# 분석 실행 (동기 API / 비동기 Job 공용)
+# ---------------------------------------------------------
+def report_cache_key(date_old: str, date_new: str, match_recoded: bool = False):
+    """ReportCache id. 코드 재발급 매칭 결과는 일반 결과를 덮어쓰지 않도록 별도 키에 저장"""
+    key = f"{date_old}_{date_new}"
+    return f"{key}:recoded" if match_recoded else key
+
+def public_result(result: dict):
+    """API 응답용: 내부 합성용 change_set 제외"""
+    return {k: v for k, v in result.items() if k != "change_set"}
+
+def compose_from_cache(db, date_old: str, date_new: str, progress=None, match_recoded: bool = False):
+    """
+    date_old ~ date_new 사이의 연속 날짜 쌍 결과가 ReportCache 에 모두 있으면
+    change_set 을 이어 붙여 기간 결과를 만듭니다. 하나라도 없으면 None (직접 비교).
+    """
+    dates = [d for (d,) in db.query(DailyData.date)
+             .filter(DailyData.date >= date_old, DailyData.date <= date_new)
+             .order_by(DailyData.date).all()]
+    # 인접한 두 날짜(구간 1개)는 합성할 것이 없으므로 직접 비교
+    if len(dates) < 3 or dates[0] != date_old or dates[-1] != date_new:
+        return None
+
+    keys = [report_cache_key(a, b) for a, b in zip(dates, dates[1:])]
+    cached_keys = {k for (k,) in db.query(ReportCache.id).filter(ReportCache.id.in_(keys)).all()}
+    if len(cached_keys) < len(keys):
+        print(f"ℹ️ [Compose] 중간 분석 결과 {len(keys) - len(cached_keys)}개 없음 -> 직접 비교")
+        return None
+
+    change_sets = []
+    for key in keys:
+        (result_json,) = db.query(ReportCache.result_json).filter(ReportCache.id == key).first()
+        change_sets.append(json.loads(result_json).get("change_set"))
+
+    # 이 기능 이전에 저장된 결과(change_set 없음/예전 형식)는 합성에 쓸 수 없음
+    stale = sum(1 for cs in change_sets if not is_composable(cs))
+    if stale:
+        print(f"ℹ️ [Compose] 변동 집합(change_set) 없는 이전 분석 결과 {stale}개 -> 직접 비교")
+        return None
+
+    if progress:
+        progress("diffing")
+    result = compose_change_sets(change_sets, date_new, progress=progress, match_recoded=match_recoded)
+    if result is not None:
+        print(f"✅ [Compose] {len(keys)}개 구간 합성으로 {date_old} ~ {date_new} 분석")
+    return result
+
+def compute_report(db, date_old: str, date_new: str, progress=None, match_recoded: bool = False):
+    """
+    두 날짜의 원본 파일을 파싱/비교하고 결과를 ReportCache 에 저장합니다.
+    중간 날짜들의 연속 분석 결과가 모두 있으면 파싱 없이 합성합니다 (compose_from_cache).
+    progress: 단계별 콜백 (parsing_old -> parsing_new -> diffing -> aggregating -> persisting)
+    match_recoded: 코드 재발급 프로젝트 매칭 사용 여부
+    """
+    report = progress or (lambda stage: None)
+    cache_key = report_cache_key(date_old, date_new, match_recoded)
+
+    # 존재 여부만 먼저 확인 (원본 BLOB 은 캐시 미스일 때만 로드)
+    found = {d for (d,) in db.query(DailyData.date).filter(DailyData.date.in_([date_old, date_new])).all()}
+    if date_old not in found or date_new not in found:
+        raise HTTPException(status_code=404, detail="원본 파일 없음")
+
+    result = compose_from_cache(db, date_old, date_new, progress=report, match_recoded=match_recoded)
+    if result is None:
+        result = diff_snapshots(db, date_old, date_new, report, match_recoded=match_recoded)
+
+    report("persisting")
+    db.query(ReportCache).filter(ReportCache.id == cache_key).delete()
+    new_cache = ReportCache(id=cache_key, date_old=date_old, date_new=date_new, result_json=json.dumps(result, ensure_ascii=False))
+    db.add(new_cache)
+    db.commit()
+
+    return result
+
+def diff_snapshots(db, date_old: str, date_new: str, report, match_recoded: bool = False):
+    """두 날짜 스냅샷을 직접 비교 (스냅샷 캐시 사용)"""
+    def load(date):
+        def loader():
+            record = db.query(DailyData).filter(DailyData.date == date).first()
+            return preprocess_file(record.content) if record else None
+        return snapshot_cache.get_or_load(date, loader)
+
+    report("parsing_old")
+    snap_old = load(date_old)
+    report("parsing_new")
+    snap_new = load(date_new)
+
+    if snap_old is None or snap_new is None:
+        raise HTTPException(status_code=400, detail="데이터 전처리 실패")
+
+    report("diffing")
+    result = run_cdc_analysis(
+        snap_old.frame, snap_new.frame, date_new, progress=report,
+        values_old=snap_old.values_frame(), values_new=snap_new.values_frame(),
+        match_recoded=match_recoded
+    )
+    return result
+
 # ---------------------------------------------------------
 # API: 분석 (DB 기반)
 # ---------------------------------------------------------
@@ -133,34 +372,162 @@ def delete_daily_data(date: str):
 def analyze_dates(req: AnalyzeRequest):
     db = SessionLocal()
     try:
-        cache_key = f"{req.date_old}_{req.date_new}"
-        
-        data_old = db.query(DailyData).filter(DailyData.date == req.date_old).first()
-        data_new = db.query(DailyData).filter(DailyData.date == req.date_new).first()
+        result = compute_report(db, req.date_old, req.date_new, match_recoded=req.match_recoded)
+        return {"message": "분석 완료", "data": public_result(result)}
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        db.close()
 
-        if not data_old or not data_new:
-            raise HTTPException(status_code=404, detail="원본 파일 없음")
+# ---------------------------------------------------------
+# API: 분석 Job (비동기 모드)
+# ---------------------------------------------------------
+# POST 는 job_id 를 바로 돌려주고, 진행 상황은 SSE(/events) 또는 폴링으로 확인합니다.
+# 결과는 ReportCache 에 저장되며 /result 로 조회합니다.
+job_manager = JobManager()
 
-        df_old = preprocess_file(data_old.content)
-        df_new = preprocess_file(data_new.content)
+# SSE 는 단계가 바뀔 때만 이벤트가 나가므로, 한 단계가 길어지면 프록시(nginx 기본 60초)가
+# 유휴 연결로 보고 끊습니다. 이벤트가 없는 동안 이 간격으로 주석 줄을 보내 연결을 유지합니다.
+SSE_KEEPALIVE_SECONDS = 15
 
-        if df_old is None or df_new is None:
-            raise HTTPException(status_code=400, detail="데이터 전처리 실패")
+def _run_analysis_job(date_old: str, date_new: str, match_recoded: bool = False):
+    def job_fn(job):
+        db = SessionLocal()
+        try:
+            compute_report(db, date_old, date_new, progress=job.report, match_recoded=match_recoded)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    return job_fn
 
-        result = run_cdc_analysis(df_old, df_new, req.date_new)
-        
-        db.query(ReportCache).filter(ReportCache.id == cache_key).delete()
-        new_cache = ReportCache(id=cache_key, date_old=req.date_old, date_new=req.date_new, result_json=json.dumps(result, ensure_ascii=False))
-        db.add(new_cache)
-        db.commit()
+def _get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업 없음")
+    return job
 
-        return {"message": "분석 완료", "data": result}
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+@app.post("/api/analyze/jobs", status_code=202)
+def create_analyze_job(req: AnalyzeRequest):
+    # 매칭 옵션이 다르면 결과가 다르므로 별도 작업/별도 캐시 키로 취급
+    cache_key = report_cache_key(req.date_old, req.date_new, req.match_recoded)
+    job, created = job_manager.submit(cache_key, _run_analysis_job(req.date_old, req.date_new, req.match_recoded))
+    return {**job.to_dict(), "created": created}
+
+@app.get("/api/analyze/jobs/{job_id}")
+def get_analyze_job(job_id: str, since: int = 0):
+    """폴링용: 작업 상태 + since 이후의 진행 이벤트"""
+    job = _get_job_or_404(job_id)
+    return {**job.to_dict(), "events": job.events_since(since)}
+
+@app.get("/api/analyze/jobs/{job_id}/events")
+async def stream_analyze_job(job_id: str, request: Request):
+    """SSE 스트림. 연결이 끊겨도 작업은 계속되며, Last-Event-ID 로 이어받을 수 있습니다."""
+    job = _get_job_or_404(job_id)
+    try:
+        seq = int(request.headers.get("last-event-id", -1)) + 1
+    except ValueError:
+        seq = 0
+
+    async def event_stream():
+        nonlocal seq
+        loop = asyncio.get_running_loop()
+        last_sent = loop.time()
+        while True:
+            events = job.events_since(seq)
+            for ev in events:
+                yield f"id: {ev['seq']}\nevent: {ev['type']}\ndata: {json.dumps(ev, ensure_ascii=False)}\n\n"
+            seq += len(events)
+            if events:
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = loop.time()
+            if not job.is_active and not job.events_since(seq):
+                break
+            if await request.is_disconnected():
+                break
+            await asyncio.sleep(0.5)
+
+    # nginx 프록시 버퍼링 끄기 (이벤트 즉시 전달)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+@app.get("/api/analyze/jobs/{job_id}/result")
+def get_analyze_job_result(job_id: str):
+    job = _get_job_or_404(job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"작업 미완료 ({job.status})")
+
+    db = SessionLocal()
+    try:
+        cached = db.query(ReportCache).filter(ReportCache.id == job.cache_key).first()
+        if not cached:
+            raise HTTPException(status_code=404, detail="분석 결과 없음")
+        return {"message": "분석 완료", "data": public_result(json.loads(cached.result_json))}
+    finally:
+        db.close()
+
+@app.delete("/api/analyze/jobs/{job_id}")
+def cancel_analyze_job(job_id: str):
+    _get_job_or_404(job_id)
+    job = job_manager.cancel(job_id)
+    return job.to_dict()
+
+# ---------------------------------------------------------
+# API: 리포트 내보내기 (xlsx / csv / ndjson 스트리밍)
+# ---------------------------------------------------------
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+@app.get("/api/export")
+def export_report(date_old: str, date_new: str, format: str = "xlsx", sheet: str = "daily_report",
+                  match_recoded: bool = False):
+    """
+    저장된 분석 결과(ReportCache)를 파일로 내려받습니다.
+    - xlsx: 상세 리포트 + 요약 시트 전체
+    - csv / ndjson: sheet 파라미터로 지정한 시트 하나 (daily_report, summary, top, sector, dept)
+    - match_recoded: 코드 재발급 매칭으로 분석한 결과를 내려받을 때 true
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 형식: {format}")
+    if sheet not in SHEETS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 시트: {sheet}")
+
+    db = SessionLocal()
+    try:
+        cached = db.query(ReportCache).filter(ReportCache.id == report_cache_key(date_old, date_new, match_recoded)).first()
+        if not cached:
+            raise HTTPException(status_code=404, detail="분석 결과 없음 (먼저 분석을 실행하세요)")
+        result = json.loads(cached.result_json)
     finally:
         db.close()
 
+    if format == "xlsx":
+        body = iter_xlsx(result)
+        filename = f"cdc_report_{date_old}_{date_new}.xlsx"
+    elif format == "csv":
+        body = iter_csv(result, sheet)
+        filename = f"cdc_{sheet}_{date_old}_{date_new}.csv"
+    else:
+        body = iter_ndjson(result, sheet)
+        filename = f"cdc_{sheet}_{date_old}_{date_new}.ndjson"
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+# ---------------------------------------------------------
+# API: 스냅샷 캐시 상태
+# ---------------------------------------------------------
+@app.get("/api/cache/snapshots")
+def get_snapshot_cache_stats():
+    return snapshot_cache.stats()
+
 # # ---------------------------------------------------------
 # # API: AI 질문 (Pydantic 우회 - 디버깅용)
 # # ---------------------------------------------------------
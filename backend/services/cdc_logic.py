@@ -2,8 +2,11 @@ import pandas as pd
 import numpy as np
 import re
 import math
+import time
 from datetime import datetime
 
+from services.project_matcher import match_recoded_projects
+
 # =========================================================
 # 1. 유틸리티 함수 (데이터 정제)
 # =========================================================
@@ -33,15 +36,18 @@ def safe_float(val):
     except:
         return 0.0
 
+# change_set 형식 버전. 행 목록이 [pid, 이전 상태, 이후 상태] (pid 는 원래 타입 유지) 인 형식
+CHANGE_SET_FORMAT = 2
+
+PROB_COLS = ['수주가능성', '확률', 'Probability', '가능성', '영업기회진행상태', 'Status']
+
 def get_probability(row):
     """
     행 데이터에서 '수주가능성' 관련 컬럼을 찾아 0~100 사이의 숫자(확률)로 반환.
     값이 없거나 유효하지 않으면 None 반환 (0으로 변환하지 않음).
     """
-    prob_cols = ['수주가능성', '확률', 'Probability', '가능성', '영업기회진행상태', 'Status']
-    
     found_col = None
-    for col in prob_cols:
+    for col in PROB_COLS:
         if col in row.index:
             found_col = col
             break
@@ -95,12 +101,108 @@ def get_pjt_schedule_and_amount(row, month_cols):
             
     return target_month, total_amt
 
+def build_month_matrix(df: pd.DataFrame, month_cols):
+    """
+    월 컬럼을 safe_float 로 변환한 project × month 숫자 행렬(DataFrame, float64)을 만듭니다.
+    df 에 없는 월 컬럼은 0 으로 채웁니다.
+    """
+    data = {col: df[col].map(safe_float) for col in month_cols if col in df.columns}
+    mat = pd.DataFrame(data, index=df.index, dtype=float)
+    return align_month_matrix(mat, month_cols)
+
+def align_month_matrix(mat: pd.DataFrame, month_cols):
+    """월 컬럼 순서를 분석 기준(month_cols)에 맞춤. 이미 맞으면 복사하지 않음"""
+    if list(mat.columns) == list(month_cols):
+        return mat
+    return mat.reindex(columns=month_cols, fill_value=0.0)
+
+def get_schedule_and_amount_matrix(values: np.ndarray, month_nums):
+    """
+    get_pjt_schedule_and_amount 의 행렬 버전.
+    각 행에서 절대값이 가장 큰 월(없으면 0)과 금액 합계를 한 번에 계산합니다.
+    """
+    n_rows = values.shape[0]
+    if values.shape[1] == 0:
+        return np.zeros(n_rows, dtype=int), np.zeros(n_rows)
+
+    totals = values.sum(axis=1)
+    abs_vals = np.abs(values)
+    peak_idx = abs_vals.argmax(axis=1)
+    has_peak = abs_vals.max(axis=1) > 0
+    targets = np.where(has_peak, np.asarray(month_nums)[peak_idx], 0)
+    return targets, totals
+
+def _json_value(val):
+    """numpy/Timestamp 등 JSON 으로 바로 저장할 수 없는 값을 기본 타입으로 변환"""
+    if isinstance(val, np.generic):
+        val = val.item()
+    if val is None or isinstance(val, (str, int, float, bool)):
+        return val
+    return str(val)
+
+def build_change_set(df_old, df_new, mat_old, mat_new, month_cols, meta_cols, totals):
+    """
+    기간 합성(span_composer)용 변동 집합.
+    존재 여부, 월별 금액, 메타 컬럼(PJT명/부서/부문/확률) 중 하나라도 바뀐 프로젝트만
+    양쪽 상태를 기록합니다. 상태: None(없음) 또는 {"meta": [...], "values": [월별 금액]}
+    rows: [[pid, 이전 상태, 이후 상태], ...] - 정수 PJT 코드가 JSON 에서 문자열 키로 바뀌지 않도록 목록으로 저장
+    """
+    new_only = ~df_new.index.isin(df_old.index)
+    old_only = ~df_old.index.isin(df_new.index)
+    common_pos_new = np.flatnonzero(~new_only)
+    common_pids = df_new.index[common_pos_new]
+    common_pos_old = df_old.index.get_indexer(common_pids)
+
+    vals_old = mat_old.to_numpy()
+    vals_new = mat_new.to_numpy()
+
+    touched = np.any(vals_new[common_pos_new] != vals_old[common_pos_old], axis=1)
+    for col in meta_cols:
+        if col is None:
+            continue
+        if col not in df_old.columns:
+            touched[:] = True
+            break
+        touched |= (
+            df_new[col].iloc[common_pos_new].astype(str).to_numpy()
+            != df_old[col].iloc[common_pos_old].astype(str).to_numpy()
+        )
+
+    def state(df, values, pos):
+        meta = [_json_value(df[col].iat[pos]) if col in df.columns else None for col in meta_cols]
+        return {"meta": meta, "values": values[pos].tolist()}
+
+    rows = []
+    for pos in np.flatnonzero(new_only):
+        rows.append([_json_value(df_new.index[pos]), None, state(df_new, vals_new, pos)])
+    for pos in np.flatnonzero(old_only):
+        rows.append([_json_value(df_old.index[pos]), state(df_old, vals_old, pos), None])
+    for pos_new, pos_old in zip(common_pos_new[touched], common_pos_old[touched]):
+        rows.append([_json_value(df_new.index[pos_new]), state(df_old, vals_old, pos_old), state(df_new, vals_new, pos_new)])
+
+    return {
+        "format": CHANGE_SET_FORMAT,
+        "columns": list(meta_cols),
+        "month_cols": list(month_cols),
+        "totals": [float(totals[0]), float(totals[1])],
+        "rows": rows,
+    }
+
 
 # =========================================================
 # 2. 핵심 분석 로직 (CDC)
 # =========================================================
 
-def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: str):
+def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: str, progress=None,
+                     values_old: pd.DataFrame = None, values_new: pd.DataFrame = None,
+                     match_recoded: bool = False):
+    """
+    progress: 진행 단계 콜백 (비동기 Job 모드에서 'aggregating' 단계 보고용, 없으면 무시)
+    values_old / values_new: 미리 변환해 둔 월별 금액 행렬 (스냅샷 캐시용, 없으면 df 에서 변환)
+    match_recoded: True 이면 코드가 재발급된 프로젝트(삭제+신규 쌍)를 유사도로 찾아 '코드 변경'으로 처리
+    """
+    t_start = time.perf_counter()
+    metrics = {"timings_ms": {}}
     
     # 1. 기준월 추출
     try:
@@ -132,8 +234,42 @@ def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: s
     dept_map_old = df_old[dept_col_old].to_dict() if dept_col_old in df_old.columns else {}
     sector_map_old = df_old[sector_col_old].to_dict() if sector_col_old else {}
 
-    old_idxs = set(df_old.index)
-    new_idxs = set(df_new.index)
+    # 월별 금액 행렬 (project × month, float). 스냅샷 캐시에서 넘어오면 그대로 재사용
+    mat_old = align_month_matrix(values_old if values_old is not None else build_month_matrix(df_old, month_cols), month_cols)
+    mat_new = align_month_matrix(values_new if values_new is not None else build_month_matrix(df_new, month_cols), month_cols)
+
+    month_nums = []
+    for m_col in month_cols:
+        try:
+            month_nums.append(int(re.sub(r'[^0-9]', '', m_col)))
+        except:
+            month_nums.append(0)
+    update_month_nums = [m % 100 if m > 12 else m for m in month_nums]
+
+    new_only_mask = ~df_new.index.isin(df_old.index)
+    old_only_mask = ~df_old.index.isin(df_new.index)
+
+    # ---------------------------------------------------------
+    # (0) 코드 재발급 매칭 (선택) - 매칭된 쌍은 신규/취소에서 제외
+    # ---------------------------------------------------------
+    recode_matches = []
+    insert_mask = new_only_mask.copy()
+    delete_mask = old_only_mask.copy()
+    if match_recoded:
+        t = time.perf_counter()
+        vals_new_all, vals_old_all = mat_new.to_numpy(), mat_old.to_numpy()
+        new_pos, old_pos = np.flatnonzero(new_only_mask), np.flatnonzero(old_only_mask)
+        new_items = [(pid, pjt_map_new.get(pid, ""), dept_map_new.get(pid, ""), vals_new_all[p])
+                     for pid, p in zip(df_new.index[new_pos].tolist(), new_pos)]
+        old_items = [(pid, pjt_map_old.get(pid, ""), dept_map_old.get(pid, ""), vals_old_all[p])
+                     for pid, p in zip(df_old.index[old_pos].tolist(), old_pos)]
+        recode_matches, recode_metrics = match_recoded_projects(old_items, new_items)
+
+        insert_mask[df_new.index.get_indexer([m["new_code"] for m in recode_matches])] = False
+        delete_mask[df_old.index.get_indexer([m["old_code"] for m in recode_matches])] = False
+
+        recode_metrics["timings_ms"]["total"] = round((time.perf_counter() - t) * 1000, 2)
+        metrics["recode"] = recode_metrics
     
     changes = []
     
@@ -141,12 +277,11 @@ def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: s
     # (A) 신규 추가 (New)
     # ---------------------------------------------------------
     insert_changes = []
-    for pid in (new_idxs - old_idxs):
-        row = df_new.loc[pid]
-        m_num, amt = get_pjt_schedule_and_amount(row, month_cols)
-        
+    new_targets, new_amounts = get_schedule_and_amount_matrix(mat_new.to_numpy()[insert_mask], month_nums)
+    for pid, m_num, amt in zip(df_new.index[insert_mask], new_targets, new_amounts):
         if amt != 0:
-            prob = get_probability(row)
+            m_num, amt = int(m_num), float(amt)
+            prob = get_probability(df_new.loc[pid])
             item = {
                 "pjt_code": pid,
                 "pjt_name": pjt_map_new.get(pid, "Unknown"),
@@ -166,12 +301,11 @@ def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: s
     # (B) 취소/드랍 (Delete)
     # ---------------------------------------------------------
     delete_changes = []
-    for pid in (old_idxs - new_idxs):
-        row = df_old.loc[pid]
-        m_num, amt = get_pjt_schedule_and_amount(row, month_cols)
-        
+    old_targets, old_amounts = get_schedule_and_amount_matrix(mat_old.to_numpy()[delete_mask], month_nums)
+    for pid, m_num, amt in zip(df_old.index[delete_mask], old_targets, old_amounts):
         if amt != 0:
-            prob = get_probability(row)
+            m_num, amt = int(m_num), float(amt)
+            prob = get_probability(df_old.loc[pid])
             item = {
                 "pjt_code": pid,
                 "pjt_name": pjt_map_old.get(pid, "Unknown"),
@@ -194,64 +328,108 @@ def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: s
     adv_sales_changes = []  
     carry_over_changes = [] 
     
-    common_pids = new_idxs & old_idxs
-    
-    for pid in common_pids:
-        row_new = df_new.loc[pid]
-        current_prob = get_probability(row_new)
+    # 공통 프로젝트만 행 정렬 후 한 번에 차이 계산 -> 변동이 있는 칸만 순회
+    common_mask = ~new_only_mask
+    # (tolist: 정수 PJT 코드도 numpy.int64 가 아닌 기본 int 로 꺼내야 JSON 저장 가능)
+    common_pids = df_new.index[common_mask].tolist()
+    vals_new = mat_new.to_numpy()[common_mask]
+    vals_old = mat_old.reindex(common_pids).to_numpy()
+    diff_mat = vals_new - vals_old
+    changed_rows, changed_cols = np.nonzero(np.abs(diff_mat) > 0)
+
+    prob_cache = {}
+
+    for r, c in zip(changed_rows, changed_cols):
+        pid = common_pids[r]
+        if r not in prob_cache:
+            prob_cache[r] = get_probability(df_new.loc[pid])
+        current_prob = prob_cache[r]
+
+        m_num = update_month_nums[c]
+        val_old = float(vals_old[r, c])
+        val_new = float(vals_new[r, c])
+        diff = val_new - val_old
+
+        final_type = "기존 변동"
+        target_list = update_changes
+        
+        if current_month > 0 and m_num < current_month:
+            final_type = "선매출"
+            target_list = adv_sales_changes
+        elif current_month > 0 and m_num > current_month and diff < 0:
+            final_type = "이월"
+            target_list = carry_over_changes
+
+        item = {
+            "pjt_code": pid,
+            "pjt_name": pjt_map_new.get(pid, "Unknown"),
+            "dept_name": dept_map_new.get(pid, "미지정"),
+            "sector_name": sector_map_new.get(pid, "미지정"), # 부문 정보 추가
+            "type": final_type,
+            "month": f"{m_num}월",
+            "old_val": val_old,
+            "new_val": val_new,
+            "diff": diff,
+            "financial_impact": diff,
+            "month_info": f"{m_num}월",
+            "probability": current_prob
+        }
+        
+        changes.append(item)
+        target_list.append(item)
 
-        for m_col in month_cols:
-            try:
-                m_num = int(re.sub(r'[^0-9]', '', m_col))
-                if m_num > 12: m_num = m_num % 100 
-            except: continue
+    # ---------------------------------------------------------
+    # (D) 코드 변경 (Re-coded) - 이전 코드 행과 새 코드 행의 월별 차이
+    # ---------------------------------------------------------
+    recoded_changes = []
+    recoded_projects = []
+    for match in recode_matches:
+        old_code, new_code = match["old_code"], match["new_code"]
+        row_old = mat_old.to_numpy()[df_old.index.get_loc(old_code)]
+        row_new = mat_new.to_numpy()[df_new.index.get_loc(new_code)]
+        prob = get_probability(df_new.loc[new_code])
+
+        recoded_projects.append({
+            **match,
+            "old_name": pjt_map_old.get(old_code, "Unknown"),
+            "pjt_name": pjt_map_new.get(new_code, "Unknown"),
+            "dept_name": dept_map_new.get(new_code, "미지정"),
+            "sector_name": sector_map_new.get(new_code, "미지정"),
+            "diff": float(row_new.sum() - row_old.sum()),
+        })
 
-            val_old = safe_float(df_old.at[pid, m_col]) if m_col in df_old.columns else 0.0
-            val_new = safe_float(df_new.at[pid, m_col])
-            diff = val_new - val_old
-            
-            if abs(diff) > 0:
-                final_type = "기존 변동"
-                target_list = update_changes
-                
-                if current_month > 0 and m_num < current_month:
-                    final_type = "선매출"
-                    target_list = adv_sales_changes
-                elif current_month > 0 and m_num > current_month and diff < 0:
-                    final_type = "이월"
-                    target_list = carry_over_changes
-
-                item = {
-                    "pjt_code": pid,
-                    "pjt_name": pjt_map_new.get(pid, "Unknown"),
-                    "dept_name": dept_map_new.get(pid, "미지정"),
-                    "sector_name": sector_map_new.get(pid, "미지정"), # 부문 정보 추가
-                    "type": final_type,
-                    "month": f"{m_num}월",
-                    "old_val": val_old,
-                    "new_val": val_new,
-                    "diff": diff,
-                    "financial_impact": diff,
-                    "month_info": f"{m_num}월",
-                    "probability": current_prob
-                }
-                
-                changes.append(item)
-                target_list.append(item)
+        for c in np.flatnonzero(np.abs(row_new - row_old) > 0):
+            m_num = update_month_nums[c]
+            val_old, val_new = float(row_old[c]), float(row_new[c])
+            item = {
+                "pjt_code": new_code,
+                "pjt_name": pjt_map_new.get(new_code, "Unknown"),
+                "dept_name": dept_map_new.get(new_code, "미지정"),
+                "sector_name": sector_map_new.get(new_code, "미지정"),
+                "type": "코드 변경",
+                "month": f"{m_num}월",
+                "old_val": val_old,
+                "new_val": val_new,
+                "diff": val_new - val_old,
+                "financial_impact": val_new - val_old,
+                "month_info": f"{m_num}월 ({old_code} → {new_code})",
+                "probability": prob
+            }
+            changes.append(item)
+            recoded_changes.append(item)
+
+    t_diff_done = time.perf_counter()
+    metrics["timings_ms"]["diff"] = round((t_diff_done - t_start) * 1000, 2)
 
     # ---------------------------------------------------------
     # 4. 통계 집계 및 리포트 생성
     # ---------------------------------------------------------
-    
+    if progress:
+        progress("aggregating")
+
     # (1) 전체 합계
-    def calc_total_df(df, m_cols):
-        total = 0
-        for col in m_cols: 
-            if col in df.columns: total += df[col].apply(safe_float).sum()
-        return total
-
-    total_new_sum = calc_total_df(df_new, month_cols)
-    total_old_sum = calc_total_df(df_old, month_cols)
+    total_new_sum = float(mat_new.to_numpy().sum())
+    total_old_sum = float(mat_old.to_numpy().sum())
     macro_diff = total_new_sum - total_old_sum
     total_impact = sum(x['financial_impact'] for x in changes)
 
@@ -324,6 +502,11 @@ def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: s
         "carry_over_count": len(carry_over_changes),
         "carry_over_amount": sum(x['diff'] for x in carry_over_changes),
         "carry_over_top": get_top_10(carry_over_changes),
+
+        "recoded_count": len(recoded_projects),
+        "recoded_amount": sum(x['diff'] for x in recoded_changes),
+        "recoded_top": get_top_10(recoded_changes),
+        "recoded_projects": recoded_projects,
         
         "sector_chart_data": sector_chart_data, # 부문별 차트
         "dept_chart_data": dept_chart_data      # 부서별 차트
@@ -348,11 +531,26 @@ def run_cdc_analysis(df_old: pd.DataFrame, df_new: pd.DataFrame, date_new_str: s
     # (7) AI용 텍스트 리포트
     text_report = "\n".join([f"- [{x['type']}] {x['pjt_name']} ({x['month']}): {x['diff']:+,.0f}" for x in changes[:50]])
 
+    # (8) 기간 합성용 변동 집합 (API 응답에서는 제외, ReportCache 에만 저장)
+    prob_col_new = next((col for col in PROB_COLS if col in df_new.columns), None)
+    meta_cols = [
+        pjt_col_new if pjt_col_new in df_new.columns else None,
+        dept_col_new if dept_col_new in df_new.columns else None,
+        sector_col_new,
+        prob_col_new,
+    ]
+    change_set = build_change_set(df_old, df_new, mat_old, mat_new, month_cols, meta_cols, (total_old_sum, total_new_sum))
+
+    metrics["timings_ms"]["aggregate"] = round((time.perf_counter() - t_diff_done) * 1000, 2)
+    metrics["timings_ms"]["total"] = round((time.perf_counter() - t_start) * 1000, 2)
+
     # 5. 최종 반환 (NaN 청소)
     result_data = {
         "summary_stats": summary_stats,
         "daily_report": daily_report,
-        "text_report": text_report
+        "text_report": text_report,
+        "change_set": change_set,
+        "metrics": metrics
     }
     
     return clean_nan(result_data)
\ No newline at end of file
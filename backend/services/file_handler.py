@@ -1,6 +1,53 @@
 import pandas as pd
 import io
+import os
 import re
+import zipfile
+from datetime import datetime
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv")
+
+# zip 업로드 시 압축 해제 후 전체 크기 상한 (압축 폭탄 / 메모리 폭증 방지)
+MAX_ARCHIVE_UNCOMPRESSED_BYTES = int(float(os.getenv("CDC_MAX_ARCHIVE_MB", "1024")) * 1024 * 1024)
+
+# 파일명에서 날짜 추출 (예: 'CDC_2026-01-02.xlsx', '20260102_export.csv', '2026.01.02.xls')
+DATE_IN_FILENAME = re.compile(r'(?<!\d)(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)')
+
+def infer_date_from_filename(filename: str):
+    """
+    파일명에 포함된 날짜를 'YYYY-MM-DD' 문자열로 반환합니다.
+    유효한 날짜를 찾지 못하면 None 을 반환합니다.
+    """
+    for m in DATE_IN_FILENAME.finditer(filename or ""):
+        try:
+            return datetime(int(m.group(1)), int(m.group(2)), int(m.group(3))).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+def extract_archive_files(archive_content: bytes, max_bytes: int = MAX_ARCHIVE_UNCOMPRESSED_BYTES):
+    """
+    zip 파일 안의 지원 형식(.xlsx/.xls/.csv) 파일을 [(파일명, bytes)] 로 반환합니다.
+    폴더, macOS 메타데이터(__MACOSX, ._*)는 제외합니다.
+    대상 파일의 압축 해제 크기 합계가 max_bytes 를 넘으면 읽기 전에 ValueError 를 발생시킵니다.
+    """
+    with zipfile.ZipFile(io.BytesIO(archive_content)) as zf:
+        targets = []
+        for info in zf.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or info.filename.startswith("__MACOSX") or name.startswith("._"):
+                continue
+            if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            targets.append((name, info))
+
+        # file_size 는 헤더 값이지만 zipfile 은 그 이상 읽지 않으므로 상한으로 쓸 수 있음
+        total = sum(info.file_size for _, info in targets)
+        if total > max_bytes:
+            raise ValueError(
+                f"압축 해제 크기 {total / 1024 / 1024:.0f}MB 가 상한 {max_bytes / 1024 / 1024:.0f}MB 를 넘습니다"
+            )
+        return [(name, zf.read(info)) for name, info in targets]
 
 def preprocess_file(file_content: bytes):
     """
@@ -0,0 +1,177 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================================================
+# 비동기 분석 작업(Job) 관리
+# =========================================================
+# /api/analyze 는 파싱~저장까지 HTTP 연결을 붙잡고 있어서
+# nginx 타임아웃이 나면 계산 결과가 통째로 버려집니다.
+# 작업을 백그라운드 스레드에서 돌리고, 진행 상황은 이벤트 목록으로 쌓아서
+# SSE 또는 폴링으로 조회할 수 있게 합니다.
+
+JOB_STAGES = ["parsing_old", "parsing_new", "diffing", "aggregating", "persisting"]
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """취소 요청된 작업이 다음 단계로 넘어가려 할 때 발생"""
+    pass
+
+
+class AnalysisJob:
+    def __init__(self, key: str, cache_key: str = None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.cache_key = cache_key or key
+        self.status = "queued"
+        self.stage = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []
+        self._cancel = threading.Event()
+        self._lock = threading.RLock()
+
+    # ---------------------------------------------------------
+    # 작업 함수에서 호출하는 메서드
+    # ---------------------------------------------------------
+    def report(self, stage: str):
+        """진행 단계 기록. 취소 요청이 있으면 여기서 중단합니다."""
+        self.check_cancelled()
+        with self._lock:
+            self.stage = stage
+            self.status = "running"
+            progress = (JOB_STAGES.index(stage) / len(JOB_STAGES)) if stage in JOB_STAGES else None
+            self._push({"type": "progress", "stage": stage, "progress": progress})
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    # ---------------------------------------------------------
+    # 내부 상태 관리
+    # ---------------------------------------------------------
+    def _push(self, event: dict):
+        with self._lock:
+            event["seq"] = len(self.events)
+            event["ts"] = time.time()
+            self.events.append(event)
+
+    def _finish(self, status: str, error: str = None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            event = {"type": status}
+            if error:
+                event["detail"] = error
+            if status == "done":
+                event["progress"] = 1.0
+            self._push(event)
+
+    @property
+    def is_active(self):
+        return self.status in ACTIVE_STATUSES
+
+    def events_since(self, seq: int):
+        with self._lock:
+            return list(self.events[seq:])
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "key": self.key,
+            "cache_key": self.cache_key,
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error,
+            "cancel_requested": self._cancel.is_set(),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    작업 키(예: '2026-01-01_2026-01-02') 단위로 중복 실행을 막는 작업 관리자.
+    - 같은 키의 작업이 이미 돌고 있으면 새로 만들지 않고 기존 작업을 돌려줍니다.
+    - 취소 요청된 작업이 아직 돌고 있는데 같은 키로 다시 요청이 오면 취소를 철회하고 이어서 씁니다.
+    - 클라이언트 연결이 끊겨도 작업은 끝까지 실행됩니다.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 200):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cdc-job")
+        self._jobs = {}
+        self._active_by_key = {}
+        self._max_finished = max_finished
+        self._lock = threading.RLock()
+
+    def submit(self, key: str, fn, cache_key: str = None):
+        """
+        fn(job) 형태의 함수를 백그라운드에서 실행합니다.
+        cache_key: 결과가 저장되는 ReportCache id (생략 시 key 와 동일)
+        반환값: (job, created) - created 가 False 이면 기존 작업에 합류한 것
+        """
+        with self._lock:
+            existing = self._active_by_key.get(key)
+            if existing and existing.is_active:
+                if existing._cancel.is_set():
+                    existing._cancel.clear()
+                    existing._push({"type": "resumed"})
+                return existing, False
+
+            job = AnalysisJob(key, cache_key)
+            job._push({"type": "queued"})
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job.is_active:
+                job._cancel.set()
+                job._push({"type": "cancel_requested"})
+            return job
+
+    def _run(self, job: AnalysisJob, fn):
+        while True:
+            try:
+                job.check_cancelled()
+                fn(job)
+                self._release(job, "done")
+            except JobCancelled:
+                with self._lock:
+                    # 취소 직후 같은 키로 재요청이 와서 취소가 철회된 경우 -> 처음부터 다시 실행
+                    if not job._cancel.is_set():
+                        continue
+                    self._release(job, "cancelled")
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                print(f"❌ [Job {job.id}] 실패: {detail}")
+                self._release(job, "failed", str(detail))
+            return
+
+    def _release(self, job: AnalysisJob, status: str, error: str = None):
+        with self._lock:
+            if self._active_by_key.get(job.key) is job:
+                del self._active_by_key[job.key]
+            job._finish(status, error)
+
+    def _prune(self):
+        # 끝난 작업은 최근 것만 남김 (lock 안에서 호출)
+        finished = [j for j in self._jobs.values() if not j.is_active]
+        if len(finished) <= self._max_finished:
+            return
+        finished.sort(key=lambda j: j.finished_at or j.created_at)
+        for j in finished[:len(finished) - self._max_finished]:
+            del self._jobs[j.id]
@@ -0,0 +1,180 @@
+import heapq
+import math
+import re
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+# =========================================================
+# 코드 재발급 프로젝트 매칭 (PJT 코드가 바뀐 동일 프로젝트 찾기)
+# =========================================================
+# ERP 에서 PJT 코드를 다시 발급하면 같은 프로젝트가 '취소/드랍' + '신규 추가' 쌍으로 잡혀
+# total_impact 가 왜곡됩니다. 삭제된 프로젝트와 새 프로젝트를
+#   - PJT명 문자 n-gram 유사도 (Jaccard)
+#   - 주관부서 일치 여부
+#   - 월별 금액 유사도 (월별 차이의 절대값 합 기준)
+# 로 비교해서 같은 프로젝트로 보이는 쌍을 찾습니다.
+#
+# 모든 쌍을 비교하면 O(N×M) 이므로, PJT명 n-gram 의 MinHash 서명을 밴드로 나눈
+# LSH 인덱스에서 같은 버킷에 들어온 쌍만 후보로 비교합니다.
+# - '사업', '유지' 처럼 많은 이름에 들어가는 n-gram(불용 n-gram)은 서명에서 빼고,
+#   이름 유사도도 n-gram 빈도(IDF) 가중 Jaccard 로 계산합니다.
+# - 항목마다 겹친 밴드 수가 많은 후보 MAX_CANDIDATES 개만 비교합니다 (후보 수 상한).
+# - PJT명 안의 숫자('2차', '2026년' 등)가 다르면 다른 프로젝트로 보고 버킷 키에 포함합니다.
+# 가중 합계와 별개로 이름/금액 유사도 각각의 최소 기준을 넘어야 매칭합니다.
+# (이름과 부서가 같아도 금액 분포가 전혀 다르면 다른 프로젝트)
+
+NGRAM = 2
+NUM_PERM = 32
+BANDS = 16                     # 밴드당 2행 -> Jaccard 약 0.25 이상부터 후보로 잡힘
+MAX_BUCKET = 200               # 너무 흔한 버킷은 건너뜀 (같은 이름이 수백 개면 어차피 구분 불가)
+MAX_CANDIDATES = 10            # 항목당 비교할 최대 후보 수
+STOPGRAM_RATIO = 0.02          # 전체 이름의 2% 이상에 들어가는 n-gram 은 서명에서 제외
+STOPGRAM_MIN_DF = 20           # 단, 이름 수가 적을 때는 제외하지 않음
+MIN_SCORE = 0.75
+MIN_NAME_SIM = 0.6
+MIN_AMOUNT_SIM = 0.8
+
+WEIGHT_NAME = 0.5
+WEIGHT_DEPT = 0.1
+WEIGHT_AMOUNT = 0.4
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20260101)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.int64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.int64)
+
+
+def _normalize(name) -> str:
+    return re.sub(r'[\s\W_]+', '', str(name or '')).lower()
+
+def _numbers(name) -> bytes:
+    return " ".join(sorted(set(re.findall(r'\d+', str(name or ''))))).encode("utf-8")
+
+def _shingles(name) -> set:
+    text = _normalize(name)
+    if len(text) <= NGRAM:
+        return {text} if text else set()
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+def _minhash(shingles: set) -> np.ndarray:
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & 0x7fffffff for s in shingles), dtype=np.int64, count=len(shingles))
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+def _weighted_jaccard(a: set, b: set, idf: dict) -> float:
+    """n-gram IDF 가중 Jaccard (흔한 n-gram 이 겹치는 것만으로는 유사도가 높아지지 않음)"""
+    if not a or not b:
+        return 0.0
+    union = sum(idf[g] for g in a | b)
+    return sum(idf[g] for g in a & b) / union if union else 0.0
+
+def _amount_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    월별 금액 유사도 = 1 - Σ|a-b| / (Σ|a| + Σ|b|)
+    분포(어느 달에 잡혔는지)와 규모가 모두 같아야 1, 겹치는 달이 없으면 0.
+    """
+    total = np.abs(a).sum() + np.abs(b).sum()
+    if total == 0:
+        return 1.0
+    return float(1.0 - np.abs(a - b).sum() / total)
+
+
+def match_recoded_projects(old_items, new_items, min_score: float = MIN_SCORE):
+    """
+    old_items / new_items: [(pid, PJT명, 부서, 월별 금액 np.ndarray)]
+      - old_items: 이전 스냅샷에만 있는 프로젝트 (취소/드랍 후보)
+      - new_items: 새 스냅샷에만 있는 프로젝트 (신규 추가 후보)
+    반환: (matches, metrics)
+      matches: [{"old_code", "new_code", "score", "name_sim", "dept_match", "amount_sim"}] (1:1, 점수 내림차순)
+      metrics: 후보 수 / 비교 쌍 수 / 단계별 소요 시간(ms)
+    """
+    t0 = time.perf_counter()
+    metrics = {"old_candidates": len(old_items), "new_candidates": len(new_items), "candidate_pairs": 0, "matched": 0}
+    if not old_items or not new_items:
+        metrics["timings_ms"] = {"index": 0.0, "score": 0.0}
+        return [], metrics
+
+    old_shingles = [_shingles(item[1]) for item in old_items]
+    new_shingles = [_shingles(item[1]) for item in new_items]
+
+    # 0. n-gram 문서 빈도 -> IDF 가중치 / 불용 n-gram
+    df = Counter()
+    for sh in old_shingles + new_shingles:
+        df.update(sh)
+    n_docs = len(old_shingles) + len(new_shingles)
+    idf = {g: math.log(1 + n_docs / c) for g, c in df.items()}
+    stop_df = max(STOPGRAM_MIN_DF, STOPGRAM_RATIO * n_docs)
+    stopgrams = {g for g, c in df.items() if c > stop_df}
+
+    # 1. LSH 인덱스: (밴드 번호, 이름 속 숫자, 밴드 서명) -> ([old idx], [new idx])
+    rows_per_band = NUM_PERM // BANDS
+    buckets = {}
+    for side, items, shingle_list in ((0, old_items, old_shingles), (1, new_items, new_shingles)):
+        for idx, sh in enumerate(shingle_list):
+            # 불용 n-gram 만으로 된 이름은 그대로 사용 (예: '유지보수' 단독)
+            sig_shingles = (sh - stopgrams) or sh
+            if not sig_shingles:
+                continue
+            sig = _minhash(sig_shingles)
+            numbers = _numbers(items[idx][1])
+            for band in range(BANDS):
+                key = (band, numbers, sig[band * rows_per_band:(band + 1) * rows_per_band].tobytes())
+                buckets.setdefault(key, ([], []))[side].append(idx)
+
+    # 겹친 밴드 수를 세고, 항목마다 상위 MAX_CANDIDATES 개만 후보로 남김 (양쪽 모두)
+    collisions = Counter()
+    for old_idx, new_idx in buckets.values():
+        if not old_idx or not new_idx or len(old_idx) + len(new_idx) > MAX_BUCKET:
+            continue
+        for i in old_idx:
+            for j in new_idx:
+                collisions[(i, j)] += 1
+
+    by_old, by_new = {}, {}
+    for (i, j), hits in collisions.items():
+        by_old.setdefault(i, []).append((-hits, j))
+        by_new.setdefault(j, []).append((-hits, i))
+    top_old = {i: {j for _, j in heapq.nsmallest(MAX_CANDIDATES, lst)} for i, lst in by_old.items()}
+    top_new = {j: {i for _, i in heapq.nsmallest(MAX_CANDIDATES, lst)} for j, lst in by_new.items()}
+    candidates = [(i, j) for (i, j) in collisions if j in top_old[i] and i in top_new[j]]
+    t1 = time.perf_counter()
+
+    # 2. 후보 쌍 점수 계산 (이름/금액 최소 기준 + 가중 합계)
+    scored = []
+    for i, j in candidates:
+        name_sim = _weighted_jaccard(old_shingles[i], new_shingles[j], idf)
+        if name_sim < MIN_NAME_SIM:
+            continue
+        amount_sim = _amount_similarity(old_items[i][3], new_items[j][3])
+        if amount_sim < MIN_AMOUNT_SIM:
+            continue
+        dept_match = str(old_items[i][2]) == str(new_items[j][2])
+        score = WEIGHT_NAME * name_sim + WEIGHT_DEPT * float(dept_match) + WEIGHT_AMOUNT * amount_sim
+        if score >= min_score:
+            scored.append((score, i, j, name_sim, dept_match, amount_sim))
+
+    # 3. 점수 높은 순으로 1:1 매칭
+    scored.sort(key=lambda x: (-x[0], x[1], x[2]))
+    used_old, used_new = set(), set()
+    matches = []
+    for score, i, j, name_sim, dept_match, amount_sim in scored:
+        if i in used_old or j in used_new:
+            continue
+        used_old.add(i)
+        used_new.add(j)
+        matches.append({
+            "old_code": old_items[i][0],
+            "new_code": new_items[j][0],
+            "score": round(float(score), 4),
+            "name_sim": round(float(name_sim), 4),
+            "dept_match": dept_match,
+            "amount_sim": round(float(amount_sim), 4),
+        })
+    t2 = time.perf_counter()
+
+    metrics["candidate_pairs"] = len(candidates)
+    metrics["matched"] = len(matches)
+    metrics["timings_ms"] = {"index": round((t1 - t0) * 1000, 2), "score": round((t2 - t1) * 1000, 2)}
+    return matches, metrics
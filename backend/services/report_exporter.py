@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# =========================================================
+# 분석 결과 내보내기 (xlsx / csv / NDJSON 스트리밍)
+# =========================================================
+# 저장된 분석 결과(ReportCache)를 행 단위 제너레이터로 풀어서 바로 흘려보냅니다.
+# 출력 버퍼는 일정 크기 단위로만 쌓이므로 행 수와 관계없이 서버 메모리가 일정합니다.
+
+CHUNK_ROWS = 1000
+FILE_CHUNK_BYTES = 64 * 1024
+
+DAILY_REPORT_COLUMNS = ["유형", "사업명", "부문", "부서", "기간", "전월 금액", "당월 금액", "증감", "확률", "비고"]
+
+SUMMARY_LABELS = {
+    "macro_total_sales": "전체 매출 합계",
+    "macro_sales_diff": "전체 매출 증감",
+    "total_impact": "총 변동 금액",
+    "new_count": "신규 추가 건수",
+    "new_amount": "신규 추가 금액",
+    "del_count": "취소/드랍 건수",
+    "del_amount": "취소/드랍 금액",
+    "update_count": "기존 변동 건수",
+    "update_amount": "기존 변동 금액",
+    "adv_sales_count": "선매출 건수",
+    "adv_sales_amount": "선매출 금액",
+    "carry_over_count": "이월 건수",
+    "carry_over_amount": "이월 금액",
+    "recoded_count": "코드 변경 건수",
+    "recoded_amount": "코드 변경 금액",
+}
+
+TOP_LABELS = {
+    "new_top": "신규 추가",
+    "del_top": "취소/드랍",
+    "update_top": "기존 변동",
+    "adv_sales_top": "선매출",
+    "carry_over_top": "이월",
+    "recoded_top": "코드 변경",
+}
+
+TOP_COLUMNS = ["구분", "PJT 코드", "사업명", "부문", "부서", "기간", "전월 금액", "당월 금액", "증감", "확률"]
+
+def _daily_report_rows(result):
+    for row in result.get("daily_report", []):
+        yield [row.get(col) for col in DAILY_REPORT_COLUMNS]
+
+def _summary_rows(result):
+    stats = result.get("summary_stats", {})
+    for key, value in stats.items():
+        if isinstance(value, (list, dict)):
+            continue
+        yield [SUMMARY_LABELS.get(key, key), value]
+
+def _top_rows(result):
+    stats = result.get("summary_stats", {})
+    for key, label in TOP_LABELS.items():
+        for item in stats.get(key, []):
+            yield [label, item.get("pjt_code"), item.get("pjt_name"), item.get("sector_name"), item.get("dept_name"),
+                   item.get("month"), item.get("old_val"), item.get("new_val"), item.get("diff"), item.get("probability")]
+
+def _sector_rows(result):
+    for item in result.get("summary_stats", {}).get("sector_chart_data", []):
+        yield [item.get("name"), item.get("financial_impact")]
+
+def _dept_rows(result):
+    for item in result.get("summary_stats", {}).get("dept_chart_data", []):
+        yield [item.get("sector_name"), item.get("dept_name"), item.get("financial_impact")]
+
+# 시트 이름 -> (엑셀 시트명, 컬럼 목록, 행 제너레이터)
+SHEETS = {
+    "daily_report": ("상세 리포트", DAILY_REPORT_COLUMNS, _daily_report_rows),
+    "summary": ("경영진 요약", ["항목", "값"], _summary_rows),
+    "top": ("유형별 Top 10", TOP_COLUMNS, _top_rows),
+    "sector": ("부문별", ["부문", "변동 금액"], _sector_rows),
+    "dept": ("부서별", ["부문", "부서", "변동 금액"], _dept_rows),
+}
+
+
+def iter_csv(result: dict, sheet: str = "daily_report"):
+    """CSV 를 CHUNK_ROWS 행 단위로 인코딩해서 내보냅니다 (엑셀 한글 호환용 BOM 포함)."""
+    _, columns, rows = SHEETS[sheet]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(columns)
+
+    for i, row in enumerate(rows(result), start=1):
+        writer.writerow(row)
+        if i % CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate(0)
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def iter_ndjson(result: dict, sheet: str = "daily_report"):
+    """한 줄에 한 행(JSON 객체)씩 내보냅니다."""
+    _, columns, rows = SHEETS[sheet]
+    lines = []
+    for row in rows(result):
+        lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        if len(lines) >= CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# ---------------------------------------------------------
+# xlsx 스트리밍
+# ---------------------------------------------------------
+# openpyxl 은 write-only 모드여도 save() 시점에 zip 을 한 번에 만들기 때문에
+# 모든 행을 쓴 뒤에야 첫 바이트가 나갑니다. 시트 XML 을 직접 zip 엔트리에 쓰고,
+# zip 출력은 seek 불가능한 버퍼로 받아서 행을 쓰는 도중에도 조각 단위로 내보냅니다.
+
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _ChunkSink:
+    """zipfile 출력을 받아두는 버퍼 (tell/seek 가 없으므로 zipfile 이 스트리밍 모드로 씀)"""
+
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        self.size = 0
+        return data
+
+
+def _cell_xml(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _row_xml(row):
+    return ("<row>" + "".join(_cell_xml(v) for v in row) + "</row>").encode("utf-8")
+
+def _package_parts(titles):
+    """시트 데이터 외의 고정 파트 (Content_Types, 관계, workbook, styles)"""
+    sheet_overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, len(titles) + 1)
+    )
+    sheets = "".join(
+        f'<sheet name="{escape(title, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+        for i, title in enumerate(titles, start=1)
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, len(titles) + 1)
+    )
+    styles_id = len(titles) + 1
+    return {
+        "[Content_Types].xml": (
+            f'{_XML_HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{sheet_overrides}</Types>'
+        ),
+        "_rels/.rels": (
+            f'{_XML_HEADER}<Relationships xmlns="{_NS_PKG_REL}">'
+            f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'{_XML_HEADER}<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{sheets}</sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'{_XML_HEADER}<Relationships xmlns="{_NS_PKG_REL}">{sheet_rels}'
+            f'<Relationship Id="rId{styles_id}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ),
+        "xl/styles.xml": (
+            f'{_XML_HEADER}<styleSheet xmlns="{_NS_MAIN}">'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        ),
+    }
+
+
+def iter_xlsx(result: dict):
+    """
+    모든 시트를 담은 xlsx 를 행을 쓰는 동안 FILE_CHUNK_BYTES 단위로 내보냅니다.
+    (시트 XML 을 zip 엔트리에 바로 쓰므로 메모리에는 아직 내보내지 않은 압축 조각만 남음)
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _package_parts([title for title, _, _ in SHEETS.values()]).items():
+            zf.writestr(name, xml)
+
+        for n, (_, columns, rows) in enumerate(SHEETS.values(), start=1):
+            with zf.open(f"xl/worksheets/sheet{n}.xml", "w") as f:
+                f.write(f'{_XML_HEADER}<worksheet xmlns="{_NS_MAIN}"><sheetData>'.encode("utf-8"))
+                f.write(_row_xml(columns))
+                for row in rows(result):
+                    f.write(_row_xml(row))
+                    if sink.size >= FILE_CHUNK_BYTES:
+                        yield sink.drain()
+                f.write(b"</sheetData></worksheet>")
+            if sink.size >= FILE_CHUNK_BYTES:
+                yield sink.drain()
+
+    if sink.size:
+        yield sink.drain()
@@ -0,0 +1,161 @@
+import contextlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from services.cdc_logic import build_month_matrix
+from services.file_handler import preprocess_file
+
+# =========================================================
+# 파싱된 스냅샷(일자별 원본) 메모리 캐시
+# =========================================================
+# 월초 같은 기준일을 고정해 두고 여러 날짜와 비교하면 매번 같은 파일을
+# 다시 파싱/숫자 변환하게 됩니다. 파싱 결과와 project × month 금액 행렬을
+# 프로세스 메모리에 보관하고, 전체 바이트 수 기준 LRU 로 내보냅니다.
+
+DEFAULT_MAX_MB = float(os.getenv("CDC_SNAPSHOT_CACHE_MB", "512"))
+
+
+class Snapshot:
+    """
+    하루치 스냅샷.
+    - frame: preprocess_file 결과 (메타 컬럼 포함)
+    - month_cols: 월 데이터 컬럼 목록
+    - values: frame.index 와 같은 순서로 정렬된 월별 금액 행렬 (np.float64)
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.month_cols = [c for c in frame.columns if re.match(r'.*[0-9]+월$', str(c))]
+        self.values = build_month_matrix(frame, self.month_cols).to_numpy(dtype=np.float64)
+        self.nbytes = int(frame.memory_usage(index=True, deep=True).sum()) + self.values.nbytes
+
+    def values_frame(self):
+        """run_cdc_analysis 에 넘길 DataFrame 뷰 (복사 없음)"""
+        return pd.DataFrame(self.values, index=self.frame.index, columns=self.month_cols, copy=False)
+
+
+def load_snapshot(content: bytes, verbose: bool = True):
+    """
+    원본 파일(bytes) -> Snapshot. 전처리 실패 시 None.
+    프로세스 풀 작업 함수로도 쓰이므로 모듈 최상위에 둡니다 (pickle 가능).
+    """
+    if verbose:
+        df = preprocess_file(content)
+    else:
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = preprocess_file(content)
+    return Snapshot(df) if df is not None else None
+
+
+class SnapshotCache:
+    """
+    날짜 -> Snapshot LRU 캐시 (스레드 안전).
+    업로드/삭제 시 invalidate(date) 로 해당 날짜를 무효화합니다.
+    같은 날짜를 동시에 요청하면 한 요청만 로딩하고 나머지는 그 결과를 기다립니다 (single-flight).
+    로딩 중에 무효화된 날짜는 캐시에 넣지 않고, 이후 요청은 새로 로딩합니다.
+    """
+
+    def __init__(self, max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loading = {}      # 날짜 -> 로딩 중인 Future (무효화되면 목록에서 빠짐)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_load(self, date: str, loader):
+        """
+        캐시에 있으면 바로 반환, 없으면 loader() 로 DataFrame 을 만들어 저장합니다.
+        loader 가 None 을 반환하면(전처리 실패) None 을 그대로 돌려주고 캐시하지 않습니다.
+        """
+        with self._lock:
+            snap = self._entries.get(date)
+            if snap is not None:
+                self._entries.move_to_end(date)
+                self.hits += 1
+                return snap
+            pending = self._loading.get(date)
+            leader = pending is None
+            if leader:
+                self.misses += 1
+                pending = self._loading[date] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return pending.result()
+
+        try:
+            frame = loader()
+            snap = Snapshot(frame) if frame is not None else None
+        except BaseException as e:
+            with self._lock:
+                if self._loading.get(date) is pending:
+                    del self._loading[date]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            # 로딩 중 invalidate 되었으면 목록에서 빠져 있으므로 캐시하지 않음
+            if self._loading.get(date) is pending:
+                del self._loading[date]
+                if snap is not None:
+                    self._put(date, snap)
+        pending.set_result(snap)
+        return snap
+
+    def put(self, date: str, snap: Snapshot):
+        """이미 파싱된 스냅샷을 직접 저장 (일괄 업로드 후 캐시 예열용)"""
+        with self._lock:
+            self._put(date, snap)
+
+    def invalidate(self, date: str):
+        with self._lock:
+            self._loading.pop(date, None)
+            snap = self._entries.pop(date, None)
+            if snap is not None:
+                self._bytes -= snap.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._loading.clear()
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "dates": list(self._entries.keys()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _put(self, date: str, snap: Snapshot):
+        # lock 안에서 호출
+        if snap.nbytes > self.max_bytes:
+            return
+        old = self._entries.pop(date, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[date] = snap
+        self._bytes += snap.nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
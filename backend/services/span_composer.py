@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+
+from services.cdc_logic import CHANGE_SET_FORMAT, run_cdc_analysis
+
+# =========================================================
+# 기간 비교 합성 (연속 날짜 변동 집합 -> 임의 기간 변동)
+# =========================================================
+# 2026-01-02 ~ 2026-09-30 처럼 먼 두 날짜를 비교할 때, 두 스냅샷 전체를 다시
+# 파싱/비교하지 않고 ReportCache 에 저장된 연속 날짜 쌍의 change_set 을 이어 붙입니다.
+#
+# 각 change_set 은 그 구간에서 바뀐 프로젝트의 [이전 상태, 이후 상태] 만 담고 있으므로,
+#   - 기간 시작 상태 = 프로젝트가 처음 등장하는 구간의 '이전 상태'
+#   - 기간 종료 상태 = 프로젝트가 마지막으로 등장하는 구간의 '이후 상태'
+# 가 됩니다. (한 번도 바뀌지 않은 프로젝트는 시작/종료 상태가 같으므로 결과에 영향 없음)
+# 중간에 삭제됐다가 다시 생긴 프로젝트도 시작/종료 상태만 보므로 자연스럽게 처리됩니다.
+# 이렇게 얻은 '바뀐 프로젝트만의 작은 스냅샷 두 개'로 run_cdc_analysis 를 그대로 실행합니다.
+#
+# 이 기능 이전에 저장된 분석 결과에는 change_set 이 없거나(또는 예전 형식이라) 합성에 쓸 수 없습니다.
+
+# 저장된 result_json 에 현재 형식 change_set 이 있는지 SQL LIKE 로 확인할 때 쓰는 문자열
+# (json.dumps 기본 구분자 기준, change_set 의 첫 키가 format)
+CHANGE_SET_MARKER = json.dumps({"change_set": {"format": CHANGE_SET_FORMAT}})[1:-2]
+
+
+def is_composable(change_set):
+    """현재 형식의 change_set 인지 (없거나 예전 형식이면 False)"""
+    return isinstance(change_set, dict) and change_set.get("format") == CHANGE_SET_FORMAT
+
+
+def can_compose(change_sets):
+    """모든 구간이 같은 컬럼 구성일 때만 합성 가능 (월 컬럼/메타 컬럼이 바뀌면 직접 비교)"""
+    if not change_sets or not all(is_composable(cs) for cs in change_sets):
+        return False
+    first = change_sets[0]
+    return all(
+        cs["columns"] == first["columns"] and cs["month_cols"] == first["month_cols"]
+        for cs in change_sets
+    )
+
+
+def _build_frame(states: dict, columns, month_cols):
+    """{pid: 상태} -> run_cdc_analysis 입력 형태의 DataFrame (PJT명 컬럼을 맨 앞에 둠)"""
+    pids = [pid for pid, st in states.items() if st is not None]
+    data = {}
+    for i, col in enumerate(columns):
+        if col is not None and col not in data:
+            data[col] = [states[pid]["meta"][i] for pid in pids]
+    for j, col in enumerate(month_cols):
+        data[col] = [states[pid]["values"][j] for pid in pids]
+    return pd.DataFrame(data, index=pd.Index(pids, dtype=object), columns=list(data.keys()))
+
+
+def compose_change_sets(change_sets, date_new: str, progress=None, **analysis_options):
+    """
+    연속 구간 change_set 목록(시간 순)을 합성해서 (첫 구간 시작일, 마지막 구간 종료일) 분석 결과를 만듭니다.
+    합성할 수 없으면 None 을 반환합니다 (호출 측에서 직접 비교로 대체).
+    """
+    if not can_compose(change_sets):
+        return None
+
+    start_state = {}
+    end_state = {}
+    for cs in change_sets:
+        for pid, old_state, new_state in cs["rows"]:
+            if pid not in start_state:
+                start_state[pid] = old_state
+            end_state[pid] = new_state
+
+    # 시작/종료 상태가 같은 프로젝트(원상 복귀)는 제외
+    net_pids = [pid for pid in start_state if start_state[pid] != end_state[pid]]
+    start_state = {pid: start_state[pid] for pid in net_pids}
+    end_state = {pid: end_state[pid] for pid in net_pids}
+
+    columns = change_sets[0]["columns"]
+    month_cols = change_sets[0]["month_cols"]
+    df_old = _build_frame(start_state, columns, month_cols)
+    df_new = _build_frame(end_state, columns, month_cols)
+
+    result = run_cdc_analysis(df_old, df_new, date_new, progress=progress, **analysis_options)
+
+    # 전체 매출 합계는 바뀌지 않은 프로젝트까지 포함해야 하므로 구간 합계로 보정
+    total_old = change_sets[0]["totals"][0]
+    total_new = change_sets[-1]["totals"][1]
+    result["summary_stats"]["macro_total_sales"] = total_new
+    result["summary_stats"]["macro_sales_diff"] = total_new - total_old
+    result["change_set"]["totals"] = [total_old, total_new]
+
+    return result
@@ -0,0 +1,45 @@
+import numpy as np
+
+from services.project_matcher import MAX_CANDIDATES, match_recoded_projects
+
+
+def months(**amounts):
+    """months(m1=100, m12=5) -> 12개월 금액 배열"""
+    values = np.zeros(12)
+    for key, amount in amounts.items():
+        values[int(key[1:]) - 1] = amount
+    return values
+
+
+def test_recoded_project_is_matched():
+    old = [("P001", "차세대 ERP 구축 2차", "1팀", months(m3=50e6, m4=30e6))]
+    new = [("P901", "차세대 ERP 구축(2차)", "1팀", months(m3=50e6, m4=31e6))]
+    matches, _ = match_recoded_projects(old, new)
+    assert [(m["old_code"], m["new_code"]) for m in matches] == [("P001", "P901")]
+
+
+def test_same_name_with_unrelated_amounts_is_not_merged():
+    # 이름/부서가 같아도 1월 1억 취소와 12월 100만 신규는 다른 프로젝트
+    old = [("A", "유지보수", "1팀", months(m1=100e6))]
+    new = [("B", "유지보수", "1팀", months(m12=1e6))]
+    matches, _ = match_recoded_projects(old, new)
+    assert matches == []
+
+
+def test_different_numbers_in_name_are_not_merged():
+    old = [("A", "MES 고도화 1차", "1팀", months(m5=10e6))]
+    new = [("B", "MES 고도화 2차", "1팀", months(m5=10e6))]
+    matches, _ = match_recoded_projects(old, new)
+    assert matches == []
+
+
+def test_common_suffix_does_not_flood_candidates():
+    # 모든 이름이 '사업' 으로 끝나도 후보 수는 항목당 상한을 넘지 않음
+    rnd = np.random.RandomState(0)
+    syllables = list("가나다라마바사아자차카타파하고노도로모보소오조초코토포호")
+    def name():
+        return "".join(rnd.choice(syllables, size=rnd.randint(3, 6))) + " 사업"
+    old = [(f"O{i}", name(), "1팀", months(m1=1e6)) for i in range(2000)]
+    new = [(f"N{i}", name(), "1팀", months(m1=1e6)) for i in range(2000)]
+    _, metrics = match_recoded_projects(old, new)
+    assert metrics["candidate_pairs"] <= MAX_CANDIDATES * len(old)
@@ -20,15 +20,29 @@ export const uploadFile = async (dateStr, file) => {
   return response.data;
 };
 
+// 여러 파일 일괄 업로드 (dateMap: { 파일명: 'YYYY-MM-DD' }, 생략 시 파일명에서 날짜 추출)
+export const uploadFilesBulk = async (files, dateMap = {}) => {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+  formData.append('dates', JSON.stringify(dateMap));
+
+  const response = await axios.post(`${API_BASE}/upload/bulk`, formData, {
+    headers: { 'Content-Type': 'multipart/form-data' }
+  });
+  return response.data;
+};
+
 export const deleteDate = async (dateStr) => {
   const response = await axios.delete(`${API_BASE}/delete/${dateStr}`);
   return response.data;
 };
 
-export const analyzeDates = async (dateOld, dateNew) => {
+// matchRecoded: 코드가 재발급된 프로젝트(취소+신규 쌍)를 '코드 변경'으로 묶어서 분석
+export const analyzeDates = async (dateOld, dateNew, { matchRecoded = false } = {}) => {
   const response = await axios.post(`${API_BASE}/analyze`, {
     date_old: dateOld,
-    date_new: dateNew
+    date_new: dateNew,
+    match_recoded: matchRecoded
   });
   return response.data;
 };
@@ -53,4 +67,10 @@ export const getMonthlyStats = async (year, month) => {
     params: { year, month }
   });
   return response.data;
-};
\ No newline at end of file
+};
+
+// 리포트 다운로드 URL (format: xlsx | csv | ndjson, sheet: daily_report | summary | top | sector | dept)
+export const getExportUrl = (dateOld, dateNew, format = 'xlsx', sheet = 'daily_report', { matchRecoded = false } = {}) => {
+  const params = new URLSearchParams({ date_old: dateOld, date_new: dateNew, format, sheet, match_recoded: matchRecoded });
+  return `${API_BASE}/export?${params.toString()}`;
+};